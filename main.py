@@ -1,15 +1,25 @@
 import os
 import logging
 from typing import Optional, List
+from collections import OrderedDict
 from datetime import datetime
 import asyncio
-from fastapi import FastAPI, HTTPException, APIRouter, BackgroundTasks
+import contextlib
+import itertools
+import random
+import aiohttp
+from fastapi import FastAPI, HTTPException, APIRouter, BackgroundTasks, Request
+from fastapi.responses import ORJSONResponse
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
 import tweepy
+from tweepy.asynchronous import AsyncClient
 from dotenv import load_dotenv
 from pydantic import BaseModel
 import time
-import threading
 import json
+import tempfile
 
 # Load environment variables
 load_dotenv()
@@ -22,7 +32,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title="Twitter API Client (Minimal)")
+app = FastAPI(title="Twitter API Client (Minimal)", default_response_class=ORJSONResponse)
+
+# Per-client request limits for endpoints that trigger Twitter writes
+request_limiter = Limiter(key_func=get_remote_address)
+app.state.limiter = request_limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Twitter API credentials
 TWITTER_API_KEY = os.getenv("TWITTER_API_KEY")
@@ -31,8 +46,12 @@ TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
 
-# Initialize Tweepy client
-client = tweepy.Client(
+# File used to persist bot state across restarts
+BOT_STATE_FILE = os.getenv("BOT_STATE_FILE", "bot_state.json")
+STATE_FLUSH_INTERVAL_SECONDS = 5
+
+# Initialize Tweepy client (its HTTP session is created on startup)
+client = AsyncClient(
     bearer_token=TWITTER_BEARER_TOKEN,
     consumer_key=TWITTER_API_KEY,
     consumer_secret=TWITTER_API_KEY_SECRET,
@@ -40,24 +59,41 @@ client = tweepy.Client(
     access_token_secret=TWITTER_ACCESS_TOKEN_SECRET
 )
 
+def _first_of_next_month_epoch(month_start):
+    """Return the epoch time at which the month after month_start begins (local time)."""
+    if month_start.month == 12:
+        next_month_start = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        next_month_start = month_start.replace(month=month_start.month + 1)
+    return next_month_start.timestamp()
+
 # Usage tracking for free tier limits
 class UsageTracker:
     def __init__(self):
-        self.reads_this_month = 0
-        self.posts_this_month_app = 0
-        self.posts_this_month_user = 0
+        self._reset_counters()
         self.last_reset = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        self._next_reset_epoch = _first_of_next_month_epoch(self.last_reset)
+        
+    def _reset_counters(self, reads=0, posts_app=0, posts_user=0):
+        # next() on itertools.count is atomic, so concurrent increments never lose updates;
+        # the *_this_month attributes hold the latest value for reporting
+        self._read_counter = itertools.count(reads + 1)
+        self._post_counter_app = itertools.count(posts_app + 1)
+        self._post_counter_user = itertools.count(posts_user + 1)
+        self.reads_this_month = reads
+        self.posts_this_month_app = posts_app
+        self.posts_this_month_user = posts_user
         
     def increment_read(self):
         self._check_reset()
-        self.reads_this_month += 1
+        self.reads_this_month = next(self._read_counter)
         if self.reads_this_month > 100:  # Free tier limit: 100 reads per month
             logger.warning("FREE TIER READ LIMIT EXCEEDED: 100 reads per month")
             
     def increment_post(self):
         self._check_reset()
-        self.posts_this_month_app += 1
-        self.posts_this_month_user += 1
+        self.posts_this_month_app = next(self._post_counter_app)
+        self.posts_this_month_user = next(self._post_counter_user)
         
         if self.posts_this_month_app > 500:  # Free tier limit: 500 posts per month (app level)
             logger.warning("FREE TIER APP POST LIMIT EXCEEDED: 500 posts per month")
@@ -66,14 +102,17 @@ class UsageTracker:
             logger.warning("FREE TIER USER POST LIMIT EXCEEDED: 500 posts per month")
             
     def _check_reset(self):
-        # Reset counters on the first day of each month
+        # Reset counters on the first day of each month; until then this is a single
+        # float compare against the precomputed start of next month
+        if time.time() < self._next_reset_epoch:
+            return
+        
         current_month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         if current_month_start > self.last_reset:
             logger.info("Resetting monthly usage counters")
-            self.reads_this_month = 0
-            self.posts_this_month_app = 0
-            self.posts_this_month_user = 0
+            self._reset_counters()
             self.last_reset = current_month_start
+        self._next_reset_epoch = _first_of_next_month_epoch(current_month_start)
             
     def get_usage_stats(self):
         self._check_reset()
@@ -86,12 +125,116 @@ class UsageTracker:
             "posts_remaining_user": max(0, 500 - self.posts_this_month_user),
             "last_reset": self.last_reset.isoformat()
         }
+        
+    def to_dict(self):
+        return {
+            "reads_this_month": self.reads_this_month,
+            "posts_this_month_app": self.posts_this_month_app,
+            "posts_this_month_user": self.posts_this_month_user,
+            "last_reset": self.last_reset.isoformat()
+        }
+        
+    def load(self, data):
+        """Restore counters saved earlier in the current month."""
+        if not data:
+            return
+        
+        try:
+            last_reset = datetime.fromisoformat(data["last_reset"])
+            reads = int(data.get("reads_this_month", 0))
+            posts_app = int(data.get("posts_this_month_app", 0))
+            posts_user = int(data.get("posts_this_month_user", 0))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring invalid saved usage counters: {e}")
+            return
+        
+        # Counters saved in an earlier month are stale
+        if last_reset != self.last_reset:
+            return
+        
+        self._reset_counters(reads=reads, posts_app=posts_app, posts_user=posts_user)
 
 # Initialize usage tracker
 usage = UsageTracker()
 
-# Initialize background task for checking mentions
-mention_check_task = None
+# Proactive token-bucket limiter for Twitter API calls
+class RateLimiter:
+    def __init__(self, requests_per_minute):
+        self.capacity = requests_per_minute
+        self.tokens = float(requests_per_minute)
+        self.updated = time.monotonic()
+        self.reset_at = 0.0  # Epoch time from x-rate-limit-reset once Twitter reports exhaustion
+        self._lock = asyncio.Lock()
+        
+    def _refill(self):
+        now = time.monotonic()
+        refill = (now - self.updated) * self.capacity / 60
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated = now
+        
+    async def acquire(self):
+        """Wait until a request may be sent without exceeding the rate limit."""
+        async with self._lock:
+            # Twitter reported the window as exhausted, so wait for it to reset
+            wait = self.reset_at - time.time()
+            if wait > 0:
+                logger.warning(f"Rate limit exhausted, waiting {wait:.0f} seconds for reset")
+                await asyncio.sleep(wait)
+            self.reset_at = 0.0
+            
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) * 60 / self.capacity)
+                self._refill()
+            self.tokens -= 1
+            
+    def update_from_headers(self, headers):
+        """Sync the bucket with the x-rate-limit-* headers of a Twitter response."""
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is not None:
+            self.tokens = min(self.capacity, float(remaining))
+            self.updated = time.monotonic()
+        if reset is not None and self.tokens < 1:
+            self.reset_at = float(reset)
+
+# One rate limiter per Twitter endpoint, since x-rate-limit-* headers are reported per endpoint;
+# rates are kept under Twitter's 15-minute windows
+me_limiter = RateLimiter(requests_per_minute=5)  # GET /2/users/me
+mentions_limiter = RateLimiter(requests_per_minute=10)  # GET /2/users/:id/mentions
+write_limiter = RateLimiter(requests_per_minute=10)  # POST /2/tweets
+
+# Caps how many tweets (posts and replies) are sent to Twitter at the same time
+write_semaphore = asyncio.Semaphore(4)
+
+# Ensures only one mention check runs at a time, so overlapping runs can't reply twice
+mention_check_lock = asyncio.Lock()
+
+async def call_twitter(limiter, method, semaphore=None, **kwargs):
+    """Call a Twitter client method once the limiter allows it.
+    
+    The limiter is awaited before the optional semaphore is taken, so a call
+    waiting out a rate-limit reset never holds a concurrency slot.
+    """
+    await limiter.acquire()
+    try:
+        async with semaphore or contextlib.nullcontext():
+            return await method(**kwargs)
+    except tweepy.TooManyRequests as e:
+        # Tweepy only exposes response headers on errors; use them to pause until the window resets
+        limiter.update_from_headers(e.response.headers)
+        raise
+
+def rate_limit_exceeded(limiter, detail):
+    """Build an HTTP 429 whose Retry-After points at the limiter's reset time."""
+    retry_after = limiter.reset_at - time.time()
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(int(retry_after) + 1 if retry_after > 0 else 60)}
+    )
+
+# Flag used to stop the background mention check loop
 mention_check_running = False
 
 # Pydantic models for request validation
@@ -111,50 +254,98 @@ async def root():
     return {"message": "Twitter API Client - Minimal Version", "groups": ["account", "tweet", "system"]}
 
 # Account Endpoints
+
+# Profile lookups are shared by concurrent /whoami callers and cached briefly,
+# since the profile rarely changes and every lookup costs a read
+WHOAMI_CACHE_SECONDS = 60
+_whoami_future: Optional[asyncio.Task] = None
+_whoami_cache: Optional[dict] = None
+_whoami_cache_expires = 0.0
+
+async def _fetch_me():
+    """Fetch the authenticated account's profile and cache it."""
+    global _whoami_cache, _whoami_cache_expires
+    
+    # Increment read counter
+    usage.increment_read()
+    
+    me = await call_twitter(me_limiter, client.get_me, user_fields=["username", "name", "description"])
+    _whoami_cache = {
+        "id": me.data.id,
+        "username": me.data.username,
+        "name": me.data.name,
+        "description": me.data.description
+    }
+    _whoami_cache_expires = time.monotonic() + WHOAMI_CACHE_SECONDS
+    return _whoami_cache
+
+def _clear_whoami_future(task):
+    global _whoami_future
+    _whoami_future = None
+
 @account_router.get("/whoami")
 async def whoami():
     """Return information about the authenticated Twitter account."""
+    global _whoami_future
+    
+    if _whoami_cache is not None and time.monotonic() < _whoami_cache_expires:
+        return _whoami_cache
+    
+    # Fail fast instead of keeping the HTTP request open until Twitter's window resets
+    if me_limiter.reset_at > time.time():
+        raise rate_limit_exceeded(me_limiter, "Twitter account lookup rate limit exhausted. Try again later.")
+    
     try:
-        # Increment read counter
-        usage.increment_read()
+        # Join the lookup already in flight, if any, instead of starting another
+        if _whoami_future is None:
+            _whoami_future = asyncio.create_task(_fetch_me())
+            _whoami_future.add_done_callback(_clear_whoami_future)
         
-        me = client.get_me(user_fields=["username", "name", "description"])
-        return {
-            "id": me.data.id,
-            "username": me.data.username,
-            "name": me.data.name,
-            "description": me.data.description
-        }
+        # Shield the shared lookup so one disconnecting caller doesn't cancel it for the rest
+        return await asyncio.shield(_whoami_future)
+    except tweepy.TooManyRequests as e:
+        logger.error(f"Error getting user info: {e}")
+        raise rate_limit_exceeded(me_limiter, "Twitter account lookup rate limit exhausted. Try again later.")
     except Exception as e:
         logger.error(f"Error getting user info: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Tweet Endpoints
 @tweet_router.post("")
-async def create_tweet(request: TweetRequest):
+@request_limiter.limit("10/minute")
+async def create_tweet(request: Request, tweet: TweetRequest):
     """Post a new tweet with the provided text."""
+    # Fail fast instead of keeping the HTTP request open until Twitter's window resets
+    if write_limiter.reset_at > time.time():
+        raise rate_limit_exceeded(write_limiter, "Twitter write rate limit exhausted. Try again later.")
+    
     try:
         # Increment post counter
         usage.increment_post()
         
         # Post the tweet
-        response = client.create_tweet(text=request.text)
+        response = await call_twitter(
+            write_limiter,
+            client.create_tweet,
+            semaphore=write_semaphore,
+            text=tweet.text
+        )
         
         return {
             "success": True,
             "tweet_id": response.data["id"],
-            "text": request.text
+            "text": tweet.text
         }
+    except tweepy.TooManyRequests as e:
+        logger.error(f"Error posting tweet: {e}")
+        raise rate_limit_exceeded(write_limiter, "Twitter write rate limit exhausted. Try again later.")
+    except tweepy.Forbidden as e:
+        logger.error(f"Error posting tweet: {e}")
+        error_msg = f"Permission error: {e}. Ensure your Twitter app has write permissions enabled in the Twitter Developer Portal."
+        raise HTTPException(status_code=403, detail=error_msg)
     except tweepy.TweepyException as e:
         logger.error(f"Error posting tweet: {e}")
-        
-        # Check for permission errors
-        if "403" in str(e):
-            error_msg = f"Permission error: {e}. Ensure your Twitter app has write permissions enabled in the Twitter Developer Portal."
-        else:
-            error_msg = str(e)
-            
-        raise HTTPException(status_code=500, detail=error_msg)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error posting tweet: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -183,8 +374,102 @@ bot_config = BotConfig(
     enabled=False  # Disabled by default
 )
 
+# Bounded store of processed mention IDs that evicts the oldest IDs first
+class ProcessedMentions:
+    def __init__(self, max_size=50_000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        
+    def __contains__(self, mention_id):
+        return mention_id in self._ids
+    
+    def __len__(self):
+        return len(self._ids)
+    
+    def __iter__(self):
+        # Oldest first, so re-adding in order restores the eviction order
+        return iter(self._ids)
+    
+    def add(self, mention_id):
+        self._ids[mention_id] = None
+        self._ids.move_to_end(mention_id)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+            
+    def clear(self):
+        self._ids.clear()
+
 # Store for processed mentions to avoid duplicate replies
-processed_mentions = set()
+processed_mentions = ProcessedMentions()
+
+# Bot state persisted to disk so restarts don't re-fetch or re-reply to old mentions
+# and usage counters survive until the end of the month
+class BotState:
+    def __init__(self):
+        self.max_mention_id = 0  # Newest mention ID handled, used as since_id
+        
+    def snapshot(self):
+        return {
+            "max_mention_id": self.max_mention_id,
+            "processed_mentions": list(processed_mentions),
+            "usage": usage.to_dict()
+        }
+        
+    def load(self, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load bot state from {path}: {e}")
+            return
+        
+        # Validate the whole file before applying any of it, since it may have been edited by hand
+        try:
+            if not isinstance(data, dict):
+                raise TypeError(f"expected a JSON object, got {type(data).__name__}")
+            max_mention_id = int(data.get("max_mention_id", 0))
+            mention_ids = [int(mention_id) for mention_id in data.get("processed_mentions", [])]
+            usage_data = data.get("usage", {})
+            if not isinstance(usage_data, dict):
+                raise TypeError(f"expected usage to be a JSON object, got {type(usage_data).__name__}")
+        except (TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Could not load bot state from {path}: {e}")
+            return
+        
+        self.max_mention_id = max_mention_id
+        for mention_id in mention_ids:
+            processed_mentions.add(mention_id)
+        usage.load(usage_data)
+        
+    @staticmethod
+    def write(path, snapshot):
+        # Write to a uniquely named temporary file first so a crash or an overlapping
+        # write never leaves a truncated state file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+bot_state = BotState()
+
+# Reply errors worth retrying on a later poll; anything else (e.g. a 403 on a deleted or
+# protected tweet, or a 400 duplicate) will never succeed and is skipped
+TRANSIENT_REPLY_ERRORS = (tweepy.TooManyRequests, tweepy.TwitterServerError, aiohttp.ClientError, asyncio.TimeoutError)
+MAX_REPLY_ATTEMPTS = 3
+
+# Failed reply attempts per mention ID, for mentions being retried
+reply_failures = {}
+
+# Caps how many batched LLM calls run at the same time
+llm_semaphore = asyncio.Semaphore(2)
 
 @bot_router.get("/status")
 async def get_bot_status():
@@ -199,97 +484,178 @@ async def get_bot_status():
 @bot_router.post("/configure")
 async def configure_bot(config: BotConfig):
     """Configure the Twitter reply bot settings."""
-    global bot_config
-    bot_config = config
+    # Update in place so existing references to bot_config stay current
+    for field, value in config.dict().items():
+        setattr(bot_config, field, value)
     return {"message": "Bot configuration updated successfully", "config": bot_config}
 
 @bot_router.post("/enable")
 async def enable_bot():
     """Enable the Twitter reply bot."""
-    global bot_config, mention_check_task
+    global bot_config
     bot_config.enabled = True
     
     # Start background task if not already running
-    if mention_check_task is None:
-        start_background_mention_check()
+    start_background_mention_check()
         
-    return {"message": "Twitter reply bot enabled", "status": get_bot_status()}
+    return {"message": "Twitter reply bot enabled", "status": await get_bot_status()}
 
 @bot_router.post("/disable")
 async def disable_bot():
     """Disable the Twitter reply bot."""
-    global bot_config, mention_check_task, mention_check_running
+    global bot_config
     bot_config.enabled = False
     
     # Stop background task if running
-    mention_check_running = False
-    if mention_check_task:
-        mention_check_task = None
+    stop_background_mention_check()
         
-    return {"message": "Twitter reply bot disabled", "status": get_bot_status()}
+    return {"message": "Twitter reply bot disabled", "status": await get_bot_status()}
 
 @bot_router.post("/check-mentions")
-async def check_mentions(background_tasks: BackgroundTasks):
+@request_limiter.limit("5/minute")
+async def check_mentions(request: Request, background_tasks: BackgroundTasks):
     """Manually trigger a check for mentions and respond to them."""
     if not bot_config.enabled:
         return {"message": "Bot is currently disabled. Enable it first."}
     
+    if mention_check_lock.locked():
+        return {"message": "A mention check is already in progress"}
+    
     background_tasks.add_task(process_mentions)
     return {"message": "Checking for mentions in the background"}
 
+async def _mention_loop():
+    """Periodically check for mentions until the bot is disabled."""
+    logger.info(f"Starting automated mention check every {bot_config.check_interval_seconds} seconds")
+    
+    while mention_check_running and bot_config.enabled:
+        try:
+            await process_mentions()
+            
+            # Sleep for the configured interval
+            await asyncio.sleep(bot_config.check_interval_seconds)
+        except Exception as e:
+            logger.error(f"Error in background mention check: {e}")
+            await asyncio.sleep(30)  # Wait 30 seconds on error before retrying
+    
+    logger.info("Stopped automated mention check")
+
 def start_background_mention_check():
-    """Start a background thread to periodically check for mentions."""
-    global mention_check_task, mention_check_running
+    """Start a background task on the event loop to periodically check for mentions."""
+    global mention_check_running
     
-    if mention_check_running:
+    task = app.state.mention_task
+    if task is not None and not task.done():
         return
     
     mention_check_running = True
+    app.state.mention_task = asyncio.create_task(_mention_loop())
+    
+    return {"message": "Background mention check started"}
+
+def stop_background_mention_check():
+    """Cancel the background mention check task if it is running."""
+    global mention_check_running
+    mention_check_running = False
     
-    def run_mention_check():
-        global mention_check_running
-        logger.info(f"Starting automated mention check every {bot_config.check_interval_seconds} seconds")
+    task = app.state.mention_task
+    if task is not None:
+        task.cancel()
+        app.state.mention_task = None
+
+async def _state_flush_loop(stop_event):
+    """Periodically write bot state to disk when it has changed, and once more when stopped."""
+    last_saved = None
+    while True:
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=STATE_FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        
+        # Read the flag before snapshotting: a stop requested while the write below is
+        # running leads to one more pass, so the final save always uses a fresh snapshot
+        stopping = stop_event.is_set()
         
-        while mention_check_running and bot_config.enabled:
+        snapshot = bot_state.snapshot()
+        if snapshot != last_saved:
             try:
-                # Create an event loop for the background thread
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # Run the process_mentions coroutine
-                loop.run_until_complete(process_mentions())
-                loop.close()
-                
-                # Sleep for the configured interval
-                time.sleep(bot_config.check_interval_seconds)
-            except Exception as e:
-                logger.error(f"Error in background mention check: {e}")
-                time.sleep(30)  # Wait 30 seconds on error before retrying
-        
-        logger.info("Stopped automated mention check")
-        mention_check_running = False
-    
-    # Create and start the background thread
-    mention_check_task = threading.Thread(target=run_mention_check)
-    mention_check_task.daemon = True  # Thread will exit when main program exits
-    mention_check_task.start()
+                await asyncio.to_thread(bot_state.write, BOT_STATE_FILE, snapshot)
+                last_saved = snapshot
+            except OSError as e:
+                logger.error(f"Error saving bot state to {BOT_STATE_FILE}: {e}")
+        
+        if stopping:
+            break
+
+@app.on_event("startup")
+async def on_startup():
+    """Open the shared Twitter HTTP session and start the mention check loop if enabled."""
+    # Reuse one keep-alive connection pool so repeated calls skip the TCP/TLS handshake
+    client.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=64, keepalive_timeout=75),
+        timeout=aiohttp.ClientTimeout(total=60)
+    )
     
-    return {"message": "Background mention check started"}
+    bot_state.load(BOT_STATE_FILE)
+    app.state.state_flush_stop = asyncio.Event()
+    app.state.state_flush_task = asyncio.create_task(_state_flush_loop(app.state.state_flush_stop))
+    
+    app.state.mention_task = None
+    if bot_config.enabled:
+        start_background_mention_check()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Stop the mention check loop, save bot state and close the shared Twitter HTTP session."""
+    stop_background_mention_check()
+    
+    # Let the flush loop finish any write in progress and do the final save itself,
+    # so two writes never run at the same time
+    app.state.state_flush_stop.set()
+    await app.state.state_flush_task
+    
+    if client.session is not None:
+        await client.session.close()
+        client.session = None
+
+# The bot's own user ID never changes, so it is only looked up once
+_cached_user_id: Optional[int] = None
+
+async def get_bot_user_id():
+    """Return the authenticated bot's user ID, fetching it on first use."""
+    global _cached_user_id
+    if _cached_user_id is None:
+        usage.increment_read()
+        user_data = await call_twitter(me_limiter, client.get_me)
+        _cached_user_id = user_data.data.id
+    return _cached_user_id
 
 # Function to process mentions
 async def process_mentions():
+    # Runs triggered by the loop and by /bot/check-mentions would otherwise read the same
+    # since_id and both reply before either marks the mentions as processed
+    if mention_check_lock.locked():
+        logger.info("Mention check already in progress, skipping")
+        return {"message": "A mention check is already in progress"}
+    
+    async with mention_check_lock:
+        return await _process_mentions()
+
+async def _process_mentions():
     try:
-        logger.info("Checking for new mentions...")
+        logger.debug("Checking for new mentions...")
         
         # Increment read counter for API usage tracking
         usage.increment_read()
         
         # Get recent mentions
-        user_data = client.get_me()
-        user_id = user_data.data.id
+        user_id = await get_bot_user_id()
         
-        mentions = client.get_users_mentions(
+        mentions = await call_twitter(
+            mentions_limiter,
+            client.get_users_mentions,
             id=user_id,
+            since_id=bot_state.max_mention_id or None,
             max_results=bot_config.max_mentions_per_check
         )
         
@@ -297,51 +663,40 @@ async def process_mentions():
             logger.info("No new mentions found.")
             return {"message": "No new mentions found"}
         
-        reply_count = 0
+        new_mentions = []
         for mention in mentions.data:
-            mention_id = mention.id
-            
             # Skip already processed mentions
-            if bot_config.store_processed_mentions and mention_id in processed_mentions:
-                logger.info(f"Skipping already processed mention {mention_id}")
+            if bot_config.store_processed_mentions and mention.id in processed_mentions:
+                logger.debug("Skipping already processed mention %s", mention.id)
                 continue
-                
-            logger.info(f"Processing mention {mention_id} from user {mention.author_id}")
-            
-            # Generate a reply
-            if bot_config.use_llm:
-                reply_text = await generate_llm_reply(mention.text)
-            else:
-                reply_text = generate_simple_reply(mention.text)
-            
-            if bot_config.response_prefix:
-                reply_text = f"{bot_config.response_prefix} {reply_text}"
-                
-            # Ensure the tweet doesn't exceed max length
-            if len(reply_text) > bot_config.tweet_max_length:
-                reply_text = reply_text[:bot_config.tweet_max_length - 3] + "..."
-            
-            # Reply to the mention
-            try:
-                response = client.create_tweet(
-                    text=reply_text,
-                    in_reply_to_tweet_id=mention_id
-                )
-                
-                # Mark as processed
-                if bot_config.store_processed_mentions:
-                    processed_mentions.add(mention_id)
-                
-                # Increment post counter
-                usage.increment_post()
-                
-                reply_count += 1
-                logger.info(f"Replied to mention {mention_id}")
-            except Exception as e:
-                logger.error(f"Error replying to mention {mention_id}: {e}")
-            
-            # Add a small delay between replies to avoid rate limits
-            time.sleep(2)
+            new_mentions.append(mention)
+        skipped_count = len(mentions.data) - len(new_mentions)
+        
+        # Generate the replies; LLM replies for the whole poll come from one batched call
+        if bot_config.use_llm:
+            reply_texts = await generate_llm_replies_batch([mention.text for mention in new_mentions])
+        else:
+            reply_texts = [generate_simple_reply(mention.text) for mention in new_mentions]
+        
+        # Reply to all new mentions concurrently, bounded by the write semaphore
+        results = await asyncio.gather(
+            *[reply_to_mention(mention, reply_text) for mention, reply_text in zip(new_mentions, reply_texts)],
+            return_exceptions=True
+        )
+        reply_count = sum(1 for result in results if result is True)
+        
+        # One summary line per poll instead of several per mention
+        logger.info(
+            "Mention check done: fetched=%d skipped=%d replied=%d failed=%d",
+            len(mentions.data), skipped_count, reply_count, len(new_mentions) - reply_count
+        )
+        
+        # Only fetch newer mentions next time, but keep transient failures in range for a retry
+        retry_ids = _mentions_to_retry(new_mentions, results)
+        if retry_ids:
+            bot_state.max_mention_id = max(bot_state.max_mention_id, min(retry_ids) - 1)
+        else:
+            bot_state.max_mention_id = max(bot_state.max_mention_id, max(mention.id for mention in mentions.data))
             
         return {"message": f"Processed {reply_count} mentions"}
     
@@ -349,13 +704,108 @@ async def process_mentions():
         logger.error(f"Error processing mentions: {e}")
         return {"error": str(e)}
 
+# Twitter counts most characters as 2 towards the tweet length; only these
+# code point ranges (Latin, Greek, Cyrillic, common punctuation, ...) count as 1
+_LIGHT_CHAR_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+def _build_char_weights():
+    weights = bytearray(b"\x02") * 0x10000
+    for start, end in _LIGHT_CHAR_RANGES:
+        weights[start:end + 1] = b"\x01" * (end - start + 1)
+    return bytes(weights)
+
+# Weight of every Basic Multilingual Plane code point; anything above it (emoji, etc.) counts as 2
+_CHAR_WEIGHTS = _build_char_weights()
+
+def tweet_weight(text):
+    """Return the length of text as counted by Twitter."""
+    return sum(_CHAR_WEIGHTS[cp] if cp < 0x10000 else 2 for cp in map(ord, text))
+
+def truncate_tweet(text, max_weight):
+    """Truncate text with an ellipsis so its Twitter-counted length fits in max_weight."""
+    if tweet_weight(text) <= max_weight:
+        return text
+    
+    budget = max_weight - 3  # Room for "..."
+    weight = 0
+    for index, cp in enumerate(map(ord, text)):
+        weight += _CHAR_WEIGHTS[cp] if cp < 0x10000 else 2
+        if weight > budget:
+            return text[:index] + "..."
+    return text
+
+def _mentions_to_retry(mentions, results):
+    """Return the IDs of mentions whose reply failed transiently and may be retried."""
+    # Without the processed-mentions store, re-fetching would re-reply to the newer
+    # mentions that succeeded, so failures are never retried
+    if not bot_config.store_processed_mentions:
+        reply_failures.clear()
+        return []
+    
+    retry_ids = []
+    for mention, result in zip(mentions, results):
+        attempts = reply_failures.pop(mention.id, 0) + 1
+        if result is True or not isinstance(result, TRANSIENT_REPLY_ERRORS):
+            continue
+        if attempts >= MAX_REPLY_ATTEMPTS:
+            logger.warning("Giving up on mention %s after %d failed replies", mention.id, attempts)
+            continue
+        reply_failures[mention.id] = attempts
+        retry_ids.append(mention.id)
+    return retry_ids
+
+async def reply_to_mention(mention, reply_text):
+    """Post a reply to a single mention. Returns True on success and raises on failure."""
+    mention_id = mention.id
+    
+    logger.debug("Processing mention %s from user %s", mention_id, mention.author_id)
+    
+    if bot_config.response_prefix:
+        reply_text = f"{bot_config.response_prefix} {reply_text}"
+        
+    # Ensure the tweet doesn't exceed max length as Twitter counts it
+    reply_text = truncate_tweet(reply_text, bot_config.tweet_max_length)
+    
+    # Reply to the mention
+    try:
+        response = await call_twitter(
+            write_limiter,
+            client.create_tweet,
+            semaphore=write_semaphore,
+            text=reply_text,
+            in_reply_to_tweet_id=mention_id
+        )
+        
+        # Mark as processed
+        if bot_config.store_processed_mentions:
+            processed_mentions.add(mention_id)
+        
+        # Increment post counter
+        usage.increment_post()
+        
+        logger.debug("Replied to mention %s", mention_id)
+        return True
+    except Exception as e:
+        logger.error(f"Error replying to mention {mention_id}: {e}")
+        raise
+
 def generate_simple_reply(mention_text):
     """Generate a simple reply to a mention."""
     return f"Thanks for mentioning me! I'm a Twitter bot running on FastAPI. Your message was: '{mention_text}'"
 
-async def generate_llm_reply(mention_text):
+# Canned replies used by the mock LLM
+_SAMPLE_TEMPLATES = (
+    "Thanks for reaching out! I noticed you mentioned '{text}'. How can I help you today?",
+    "I appreciate your mention! I'm a Twitter bot that's here to assist. Regarding '{text}', what would you like to know?",
+    "Hello there! Thanks for the mention. I'm processing your request about '{text}' and will do my best to help."
+)
+
+async def generate_llm_replies_batch(mention_texts):
     """
-    Generate a reply using an LLM (OpenAI GPT, etc).
+    Generate replies to several mentions with a single LLM call (OpenAI GPT, etc).
+    
+    All mentions are sent as one JSON list and the model is asked for a JSON
+    array of replies in the same order, so each poll costs one provider round trip.
     
     In a production environment, you would:
     1. Call your LLM API with proper prompt engineering
@@ -364,47 +814,47 @@ async def generate_llm_reply(mention_text):
     
     This is a mock implementation that simulates an LLM response.
     """
+    if not mention_texts:
+        return []
+    
     try:
-        # This is where you would call your LLM API
-        # Example with OpenAI (commented out):
-        """
-        import openai
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": bot_config.llm_system_prompt},
-                {"role": "user", "content": f"Please respond to this Twitter mention: '{mention_text}'. Keep your response under 280 characters."}
-            ],
-            max_tokens=100,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
-        """
-        
-        # Mock LLM response for demonstration
-        logger.info(f"Generating LLM response for: {mention_text}")
-        
-        # Simulate an LLM response
-        sample_responses = [
-            f"Thanks for reaching out! I noticed you mentioned '{mention_text}'. How can I help you today?",
-            f"I appreciate your mention! I'm a Twitter bot that's here to assist. Regarding '{mention_text}', what would you like to know?",
-            f"Hello there! Thanks for the mention. I'm processing your request about '{mention_text}' and will do my best to help."
-        ]
-        
-        import random
-        response = random.choice(sample_responses)
+        async with llm_semaphore:
+            # This is where you would call your LLM API
+            # Example with OpenAI (commented out):
+            """
+            import openai
+            openai.api_key = os.getenv("OPENAI_API_KEY")
+            
+            response = await openai.ChatCompletion.acreate(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": bot_config.llm_system_prompt},
+                    {"role": "user", "content": "Please respond to each of these Twitter mentions. Return only a JSON array of strings with one reply per mention, in the same order. Keep each reply under 280 characters.\n" + json.dumps(mention_texts)}
+                ],
+                max_tokens=100 * len(mention_texts),
+                temperature=0.7
+            )
+            
+            replies = json.loads(response.choices[0].message.content)
+            """
+            
+            # Mock LLM response for demonstration
+            logger.info(f"Generating LLM responses for {len(mention_texts)} mentions")
+            
+            # Simulate an LLM response
+            replies = [random.choice(_SAMPLE_TEMPLATES).format(text=text) for text in mention_texts]
+            
+            # Simulate processing time
+            await asyncio.sleep(1)
         
-        # Simulate processing time
-        await asyncio.sleep(1)
+        if len(replies) != len(mention_texts):
+            raise ValueError(f"Expected {len(mention_texts)} replies, got {len(replies)}")
         
-        return response
+        return replies
         
     except Exception as e:
-        logger.error(f"Error generating LLM response: {e}")
-        return "Thank you for your mention! I'm currently experiencing technical difficulties but will get back to you soon."
+        logger.error(f"Error generating LLM responses: {e}")
+        return ["Thank you for your mention! I'm currently experiencing technical difficulties but will get back to you soon."] * len(mention_texts)
 
 # Endpoint to clear the processed mentions cache
 @bot_router.post("/clear-cache")